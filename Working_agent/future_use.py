@@ -1,65 +1,152 @@
 # We can use this advance function in medical_ner_piepline for future use to look up for the term.
 
+import asyncio
+import threading
+import time
+
+import aiohttp
+import orjson
+import requests
+from requests.adapters import HTTPAdapter, Retry
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+# UMLS allows 20 requests/second - keep concurrent strategies under that cap
+_UMLS_RATE_SEMAPHORE_SIZE = 20
+
+# Process-wide lookup cache: clinical notes repeat terms ("fever", "chest pain")
+# constantly, and a dict hit is O(1) vs a ~100-500ms network round trip. This
+# also sidesteps the SQLite thread-safety issue that forces use_cache=False
+# under Streamlit. Negative (empty) results are kept too, with a shorter TTL,
+# so unknown terms don't re-hammer UMLS.
+_UMLS_CACHE: Dict[str, tuple] = {}  # key -> (timestamp, results)
+_UMLS_CACHE_LOCK = threading.Lock()
+_UMLS_CACHE_TTL = 30 * 24 * 3600  # positive results
+_UMLS_NEGATIVE_TTL = 24 * 3600  # empty results
+
+
+def _cache_get(term_key: str) -> Optional[List[Dict]]:
+    with _UMLS_CACHE_LOCK:
+        entry = _UMLS_CACHE.get(term_key)
+    if entry is None:
+        return None
+    timestamp, results = entry
+    ttl = _UMLS_CACHE_TTL if results else _UMLS_NEGATIVE_TTL
+    if time.time() - timestamp > ttl:
+        return None
+    return results
+
+
+def _cache_put(term_key: str, results: List[Dict]):
+    with _UMLS_CACHE_LOCK:
+        _UMLS_CACHE[term_key] = (time.time(), results)
+
+
+# Predefined semantic-type whitelist (UMLS abbreviations) covering the
+# symptom/disease/treatment groups the pipeline cares about. Kept as a
+# frozenset so the per-result membership test is O(1).
+_RELEVANT_SEMANTIC_TYPES = frozenset({
+    'sosy', 'dsyn', 'mobd', 'neop', 'anab', 'fndg', 'patf', 'cgab', 'inpo',
+    'topp', 'antb', 'clnd', 'vita', 'orch', 'aapp', 'phsu', 'lbpr', 'diap',
+})
+
+
+# Immutable search-strategy templates, hoisted to module scope so a per-term
+# call only merges in the term and ticket instead of re-allocating the four
+# strategy dicts every time. Small pages first; escalate to 10 only if the
+# whole first pass misses.
+_STRATEGY_TEMPLATES = (
+    # Strategy 1: Exact match, any vocabulary
+    {'searchType': 'exact', 'returnIdType': 'sourceUi', 'pageSize': 3},
+    # Strategy 2: Approximate match, any vocabulary
+    {'searchType': 'approximate', 'returnIdType': 'sourceUi', 'pageSize': 3},
+    # Strategy 3: Word search with SNOMED CT
+    {'searchType': 'words', 'sabs': 'SNOMEDCT_US', 'returnIdType': 'sourceUi', 'pageSize': 10},
+    # Strategy 4: Word search with MeSH
+    {'searchType': 'words', 'sabs': 'MSH', 'returnIdType': 'sourceUi', 'pageSize': 10},
+)
+
+# Second pass: broad strategies again with the original pageSize=10
+_ESCALATION_TEMPLATES = (
+    {'searchType': 'exact', 'returnIdType': 'sourceUi', 'pageSize': 10},
+    {'searchType': 'approximate', 'returnIdType': 'sourceUi', 'pageSize': 10},
+)
+
+
+def _filter_relevant(results: List[Dict]) -> List[Dict]:
+    """Keep only results whose semantic type is in the whitelist.
+
+    Results without semantic-type information (the common case for the
+    /search endpoint) pass through untouched.
+    """
+    filtered = []
+    for result in results:
+        sem_type = (result.get('semanticType') or result.get('semanticTypes') or '')
+        if isinstance(sem_type, str):
+            sem_types = [sem_type] if sem_type else []
+        else:
+            sem_types = list(sem_type)
+        if not sem_types or any(st in _RELEVANT_SEMANTIC_TYPES for st in sem_types):
+            filtered.append(result)
+    return filtered
+
+
+def _get_session(self) -> requests.Session:
+    """Lazily create one pooled requests.Session shared by all sync UMLS calls.
+
+    A fresh requests.get pays a full TCP+TLS handshake per strategy; keep-alive
+    amortizes that across strategies and across terms.
+    """
+    session = getattr(self, '_session', None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+        session.headers.update({
+            'Accept': 'application/json',
+            'User-Agent': 'medical-ai-agent/0.1'
+        })
+        self._session = session
+    return session
+
+
 def _search_umls_concept_enhanced(self, term: str) -> List[Dict]:
+    term_key = term.strip().lower()
+    cached = _cache_get(term_key)
+    if cached is not None:
+        logger.debug(f"Cache hit for '{term}'")
+        return cached
+
     service_ticket = self._get_fresh_service_ticket()
     if not service_ticket:
         return []
 
-    search_strategies = [
-        # Strategy 1: Exact match, any vocabulary
-        {
-            'ticket': service_ticket,
-            'string': term,
-            'searchType': 'exact',
-            'returnIdType': 'sourceUi',
-            'pageSize': 10
-        },
-        # Strategy 2: Approximate match, any vocabulary
-        {
-            'ticket': None,  # Will get fresh ticket
-            'string': term,
-            'searchType': 'approximate',
-            'returnIdType': 'sourceUi',
-            'pageSize': 10
-        },
-        # Strategy 3: Word search with SNOMED CT
-        {
-            'ticket': None,  # Will get fresh ticket
-            'string': term,
-            'searchType': 'words',
-            'sabs': 'SNOMEDCT_US',
-            'returnIdType': 'sourceUi',
-            'pageSize': 10
-        },
-        # Strategy 4: Word search with MeSH
-        {
-            'ticket': None,  # Will get fresh ticket
-            'string': term,
-            'searchType': 'words',
-            'sabs': 'MSH',
-            'returnIdType': 'sourceUi',
-            'pageSize': 10
-        }
-    ]
-
-    for i, params in enumerate(search_strategies):
+    for i, template in enumerate(_STRATEGY_TEMPLATES + _ESCALATION_TEMPLATES):
         try:
-            # Get fresh ticket for each strategy (except first)
-            if params['ticket'] is None:
-                fresh_ticket = self._get_fresh_service_ticket()
-                if not fresh_ticket:
-                    continue
-                params['ticket'] = fresh_ticket
+            # Service tickets are single-use: reuse the prefetched one for the
+            # first strategy, then fetch a fresh one per attempt
+            ticket = service_ticket if i == 0 else self._get_fresh_service_ticket()
+            if not ticket:
+                continue
+
+            params = {**template, 'string': term, 'ticket': ticket}
 
             logger.debug(f"Trying search strategy {i + 1} for '{term}'")
-            response = requests.get(self.search_endpoint, params=params, timeout=15)
+            response = self._get_session().get(self.search_endpoint, params=params, timeout=15)
 
             if response.status_code == 200:
-                data = response.json()
-                results = data.get('result', {}).get('results', [])
+                # orjson decodes typical UMLS payloads several times faster
+                # than the stdlib parser behind response.json()
+                data = orjson.loads(response.content)
+                results = _filter_relevant(data.get('result', {}).get('results', []))
 
                 if results:
                     logger.debug(f"Strategy {i + 1} found {len(results)} results for '{term}'")
+                    _cache_put(term_key, results)
                     return results
             else:
                 logger.debug(f"Strategy {i + 1} failed: {response.status_code}")
@@ -68,4 +155,99 @@ def _search_umls_concept_enhanced(self, term: str) -> List[Dict]:
             logger.debug(f"Strategy {i + 1} error: {e}")
             continue
 
-    return []
\ No newline at end of file
+    _cache_put(term_key, [])
+    return []
+
+
+# Async version: the 4 strategies above are pure I/O, so running them serially
+# pays sum-of-strategies latency. Firing them concurrently and taking the first
+# non-empty result pays only max-of-strategies.
+
+def _aget_session(self) -> "aiohttp.ClientSession":
+    """Lazily create one shared aiohttp session for all UMLS calls."""
+    session = getattr(self, '_aio_session', None)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=15)
+        )
+        self._aio_session = session
+        self._umls_semaphore = asyncio.Semaphore(_UMLS_RATE_SEMAPHORE_SIZE)
+    return session
+
+
+async def _aget_ticket(self) -> Optional[str]:
+    """Fetch one fresh service ticket (service tickets are single-use)."""
+    tgt_url = self._get_tgt_url()
+    if not tgt_url:
+        return None
+
+    session = self._aget_session()
+    try:
+        async with self._umls_semaphore:
+            async with session.post(tgt_url, data={'service': 'http://umlsks.nlm.nih.gov'}) as response:
+                if response.status == 200:
+                    ticket = (await response.text()).strip()
+                    return ticket
+        logger.debug(f"Async ticket request failed: {response.status}")
+        return None
+    except Exception as e:
+        logger.debug(f"Async ticket request error: {e}")
+        return None
+
+
+async def _try_strategy(self, params: Dict) -> List[Dict]:
+    """Run one search strategy; returns [] on any failure."""
+    session = self._aget_session()
+    try:
+        async with self._umls_semaphore:
+            async with session.get(self.search_endpoint, params=params) as response:
+                if response.status != 200:
+                    logger.debug(f"Strategy failed: {response.status}")
+                    return []
+                data = orjson.loads(await response.read())
+                return _filter_relevant(data.get('result', {}).get('results', []))
+    except Exception as e:
+        logger.debug(f"Strategy error: {e}")
+        return []
+
+
+async def _search_umls_concept_enhanced_async(self, term: str) -> List[Dict]:
+    """Run all 4 search strategies concurrently, return the first non-empty result."""
+
+    term_key = term.strip().lower()
+    cached = _cache_get(term_key)
+    if cached is not None:
+        logger.debug(f"Cache hit for '{term}'")
+        return cached
+
+    # Service tickets are single-use, so prefetch one per strategy in parallel
+    tickets = await asyncio.gather(*(self._aget_ticket() for _ in _STRATEGY_TEMPLATES))
+
+    tasks = []
+    for params, ticket in zip(_STRATEGY_TEMPLATES, tickets):
+        if not ticket:
+            continue
+        tasks.append(asyncio.ensure_future(
+            self._try_strategy({**params, 'string': term, 'ticket': ticket})
+        ))
+
+    if not tasks:
+        logger.error("Could not get any service tickets for async search")
+        return []
+
+    results = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            strategy_results = await finished
+            if strategy_results:
+                logger.debug(f"Async strategy found {len(strategy_results)} results for '{term}'")
+                results = strategy_results
+                break
+    finally:
+        # First non-empty result wins - cancel the stragglers
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    _cache_put(term_key, results)
+    return results
@@ -5,7 +5,10 @@ No FastAPI needed - direct crew integration
 
 import streamlit as st
 import os
+import queue
 import sys
+import threading
+from collections import deque
 from pathlib import Path
 from datetime import datetime
 import time
@@ -61,9 +64,45 @@ def get_crew():
         st.success("✓ Medical AI loaded (cache disabled for Streamlit)")
     return crew
 
-# Initialize session state
+# Kick the heavyweight load (BioBERT weights + UMLS client + 5 agents) off in
+# the background right away so it overlaps the first page render; the later
+# get_crew() call in the sidebar then hits the st.cache_resource entry
+def _prewarm_crew():
+    try:
+        get_crew()
+    except Exception:
+        pass  # errors surface on the main-thread get_crew() call
+
+
+if 'crew_prewarm_started' not in st.session_state:
+    st.session_state.crew_prewarm_started = True
+    threading.Thread(target=_prewarm_crew, daemon=True).start()
+
+# Cached pipeline wrappers: identical inputs (e.g. the canned examples clicked
+# repeatedly) replay from cache instead of re-running BioBERT + UMLS + Gemini.
+# Leading-underscore args are skipped by Streamlit's hashing.
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def run_ner_extraction(text: str, _crew):
+    # Returns (structured result, formatted entity context) from one
+    # pipeline run; step 2 reuses both instead of re-running NER
+    return _crew.nlp_agent_handler.process_medical_text_with_format(text)
+
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def run_full_analysis(text: str, _crew, _task_callback=None,
+                      _ner_result=None, _entity_context=None):
+    return _crew.process_medical_query_enhanced(
+        text,
+        task_callback=_task_callback,
+        ner_result=_ner_result,
+        entity_context=_entity_context
+    )
+
+
+# Initialize session state - ring buffer so long sessions don't grow the
+# serialized state unboundedly (only the last few entries are ever displayed)
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = deque(maxlen=50)
 
 # Header
 st.title("🏥 Medical AI Clinical Decision Support System")
@@ -142,7 +181,7 @@ if analyze_button and patient_input.strip():
         progress_bar.progress(20)
 
         with st.spinner("Processing with BioBERT NER..."):
-            ner_result = crew.nlp_agent_handler.process_medical_text(patient_input)
+            ner_result, entity_context = run_ner_extraction(patient_input.strip(), crew)
 
         # Display NER results
         if show_ner:
@@ -174,8 +213,45 @@ if analyze_button and patient_input.strip():
         status_text.text("Step 2/5: Clinical reasoning analysis...")
         progress_bar.progress(40)
 
+        # Run the crew in a background thread and stream each task's output
+        # into the page as it completes, instead of blocking until the full
+        # 4-agent pipeline is done
         with st.spinner("Running multi-agent analysis..."):
-            result = crew.process_medical_query_enhanced(patient_input)
+            _DONE = object()
+            task_queue = queue.Queue()
+            run_state = {}
+
+            def _run_crew():
+                try:
+                    run_state['result'] = run_full_analysis(
+                        patient_input.strip(),
+                        crew,
+                        _task_callback=task_queue.put,
+                        _ner_result=ner_result,
+                        _entity_context=entity_context
+                    )
+                except Exception as exc:
+                    run_state['error'] = exc
+                finally:
+                    task_queue.put(_DONE)
+
+            def _stream_task_outputs():
+                while True:
+                    item = task_queue.get()
+                    if item is _DONE:
+                        break
+                    agent_role = str(getattr(item, 'agent', 'Agent')).strip()
+                    raw_output = getattr(item, 'raw', None) or str(item)
+                    yield f"**{agent_role}**\n\n{raw_output}\n\n---\n\n"
+
+            worker = threading.Thread(target=_run_crew, daemon=True)
+            worker.start()
+            st.write_stream(_stream_task_outputs())
+            worker.join()
+
+            if 'error' in run_state:
+                raise run_state['error']
+            result = run_state['result']
 
         processing_time = time.time() - start_time
 
@@ -256,7 +332,7 @@ if st.session_state.history:
     st.markdown("---")
     st.header("Analysis History")
 
-    for i, item in enumerate(reversed(st.session_state.history[-5:])):  # Show last 5
+    for i, item in enumerate(list(st.session_state.history)[-5:][::-1]):  # Show last 5
         with st.expander(f"Case {len(st.session_state.history) - i}: {item['timestamp'][:19]}"):
             st.write(f"**Input:** {item['input']}")
             st.write(f"**Entities Found:** {item['entities_found']}")
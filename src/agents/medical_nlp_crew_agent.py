@@ -1,13 +1,33 @@
+import asyncio
+
 from crewai import Agent, LLM
 from typing import Dict, Any
 from loguru import logger
 from src.pipelines.medical_ner_pipeline import MedicalNLPAgent, NERConfig
-from tenacity import retry, stop_after_attempt, wait_exponential
-import time
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from dotenv import load_dotenv
 load_dotenv()
 from crewai import Crew, Task, Process
 
+import httpx
+import litellm
+
+# Route all litellm/Gemini traffic through pre-built HTTP/2 clients so the
+# agents' calls multiplex over one kept-alive TCP+TLS connection instead of
+# paying a fresh handshake per step
+_LITELLM_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+litellm.client_session = httpx.Client(http2=True, limits=_LITELLM_LIMITS, timeout=60.0)
+litellm.aclient_session = httpx.AsyncClient(http2=True, limits=_LITELLM_LIMITS, timeout=60.0)
+
+
+def _is_retryable_error(exc: BaseException) -> bool:
+    """Retry only on rate limiting and timeouts, not on genuine failures"""
+    return (
+        isinstance(exc, TimeoutError)
+        or "429" in str(exc)
+        or "rate limit" in str(exc).lower()
+    )
+
 
 class Enhanced_Medical_NLP_Agent:
 
@@ -22,9 +42,10 @@ class Enhanced_Medical_NLP_Agent:
         else:
             logger.warning("Running without UMLS (rule-based only)")
 
-        # Set up the LLM for CrewAI
+        # Set up the LLM for CrewAI - one shared client instance so every agent
+        # reuses the same underlying HTTP session instead of re-handshaking
         if use_gemini:
-            self.llm = "gemini/gemini-2.0-flash-lite"
+            self.llm = LLM(model="gemini/gemini-2.0-flash-lite", temperature=0.3)
     #     else:
     #         self.llm = LLM(
     #     model="ollama/qwen2:1.5b",
@@ -51,27 +72,22 @@ class Enhanced_Medical_NLP_Agent:
             verbose=True,
             allow_delegation=False,
             llm=self.llm,
-            max_iter=1,
-            max_rpm=5
+            max_iter=1
         )
     
     @retry(
         stop=stop_after_attempt(2),
-        wait=wait_exponential(multiplier=1, min=30, max=60)
+        wait=wait_random_exponential(min=5, max=60),
+        retry=retry_if_exception(_is_retryable_error)
     )
     def process_with_retry(self, crew, inputs=None):
 
-        try:
-            if inputs:
-                return crew.kickoff(inputs=inputs)
-            else:
-                return crew.kickoff()
-        except Exception as e:
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                logger.warning(f"Rate limit hit, waiting...")
-                time.sleep(35)
-                raise
-            raise
+        # Jittered backoff is handled entirely by tenacity - no extra sleep
+        # here, which used to double-count with the retry wait
+        if inputs:
+            return crew.kickoff(inputs=inputs)
+        else:
+            return crew.kickoff()
 
     def process_medical_text(self, text: str) -> Dict[str, Any]:
 
@@ -83,6 +99,12 @@ class Enhanced_Medical_NLP_Agent:
 
         return result
 
+    def process_medical_text_with_format(self, text: str) -> tuple:
+        """Run NER exactly once and return (structured result, formatted string)"""
+        result, formatted = self.ner_pipeline.get_structured_entities_and_format(text)
+        result["summary"] = self._generate_summary(result)
+        return result, formatted
+
     def get_formatted_output(self, text: str) -> str:
 
         return self.ner_pipeline.extract_medical_entities(text)
@@ -118,6 +140,48 @@ class EnhancedMedicalCrewMVP:
         # Create all agents including the enhanced NLP agent
         self.agents = self._create_agents()
 
+        # Immutable task description templates, built once here and formatted
+        # per query instead of re-assembling the long f-strings on every call
+        self._task_templates = {
+            "reasoning": """Based on the extracted medical entities:
+
+            {entity_context}
+
+            Original text: {patient_input}
+
+            Provide:
+            1. Top 3 possible diagnoses based on the identified symptoms and conditions
+            2. Clinical significance of the identified medications
+            3. Any red flags requiring immediate attention""",
+
+            "drug": """Review the medications identified:
+
+                Medications found: {medications}
+
+                Check for:
+                1. Potential drug-drug interactions
+                2. Contraindications based on identified conditions
+                3. Appropriate dosing concerns""",
+
+            "validation": """Validate the medical information:
+
+            Extracted Entities:
+            - Diseases: {diseases} found
+            - Symptoms: {symptoms} found
+            - Medications: {medications} found
+
+            Entities needing review: {needs_review}
+
+            Verify the accuracy and flag any concerns.""",
+
+            "education": """Create a patient-friendly summary that:
+            1. Explains the identified conditions in simple terms
+            2. Clarifies medication purposes
+            3. Provides clear next steps
+
+            Use simple language, no medical jargon.""",
+        }
+
         logger.info("Medical Crew initialized with BioBERT NER")
 
 
@@ -129,8 +193,10 @@ class EnhancedMedicalCrewMVP:
         # Enhanced NLP Agent with BioBERT
         agents["medical_nlp"] = self.nlp_agent_handler.create_crew_agent()
 
-        # Other agents (using your existing setup)
-        llm = "gemini/gemini-2.0-flash-lite"
+        # Other agents share the same LLM client - a per-agent max_rpm=5 cap
+        # would serialize the pipeline to 12s between calls per agent, so rate
+        # limiting is left to the crew-level max_rpm instead
+        llm = self.nlp_agent_handler.llm
 #         llm = LLM(
 #     model="ollama/qwen2:1.5b",
 #     base_url="http://localhost:11434",
@@ -148,8 +214,7 @@ class EnhancedMedicalCrewMVP:
             verbose=True,
             allow_delegation=False,
             llm=llm,
-            max_iter=1,
-            max_rpm = 5
+            max_iter=1
         )
 
         agents["drug_interaction"] = Agent(
@@ -161,8 +226,7 @@ class EnhancedMedicalCrewMVP:
             verbose=True,
             allow_delegation=False,
             llm=llm,
-            max_iter=1,
-            max_rpm=5
+            max_iter=1
         )
 
         agents["knowledge_validation"] = Agent(
@@ -174,8 +238,7 @@ class EnhancedMedicalCrewMVP:
             verbose=True,
             allow_delegation=False,
             llm=llm,
-            max_iter=1,
-            max_rpm=5
+            max_iter=1
         )
 
         agents["patient_education"] = Agent(
@@ -186,8 +249,7 @@ class EnhancedMedicalCrewMVP:
             verbose=True,
             allow_delegation=False,
             llm=llm,
-            max_iter=1,
-            max_rpm=5
+            max_iter=1
         )
 
         return agents
@@ -195,116 +257,126 @@ class EnhancedMedicalCrewMVP:
     
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=30, max=60)
+        wait=wait_random_exponential(min=5, max=60),
+        retry=retry_if_exception(_is_retryable_error)
     )
     def process_with_retry(self, crew, inputs=None):
         """Process crew kickoff with retry logic for rate limiting"""
-        try:
-            if inputs:
-                return crew.kickoff(inputs=inputs)
-            else:
-                return crew.kickoff()
-        except Exception as e:
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                logger.warning(f"Rate limit hit, waiting...")
-                time.sleep(35)
-                raise
-            raise
+        if inputs:
+            return crew.kickoff(inputs=inputs)
+        else:
+            return crew.kickoff()
 
-    def process_medical_query_enhanced(self, patient_input: str) -> Dict[str, Any]:
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_random_exponential(min=5, max=60),
+        retry=retry_if_exception(_is_retryable_error)
+    )
+    def run_crews_parallel(self, *crews):
+        """Kick off several independent crews concurrently via kickoff_async"""
 
-        logger.info(f"Processing query with enhanced NER: {patient_input[:100]}...")
+        async def _kickoff_all():
+            return await asyncio.gather(*(crew.kickoff_async() for crew in crews))
 
-        # First, extract entities using BioBERT NER
-        ner_result = self.nlp_agent_handler.process_medical_text(patient_input)
+        return asyncio.run(_kickoff_all())
 
-        # Format entities for task context
-        entity_context = self.nlp_agent_handler.get_formatted_output(patient_input)
+    def process_medical_query_enhanced(self, patient_input: str,
+                                       task_callback=None,
+                                       ner_result: Dict[str, Any] = None,
+                                       entity_context: str = None) -> Dict[str, Any]:
 
-        # Task 1: Enhanced NLP extraction 
-        nlp_task = Task(
-            description=f"""You have already extracted medical entities using BioBERT.
-            Here are the results:
+        logger.info(f"Processing query with enhanced NER: {patient_input[:100]}...")
 
-            {entity_context}
+        # Extract entities using BioBERT NER exactly once; callers that
+        # already ran NER (the Streamlit app shows it as step 1) pass the
+        # result in so the BioBERT + UMLS pipeline is not run a second time
+        if ner_result is None or entity_context is None:
+            ner_result, entity_context = self.nlp_agent_handler.process_medical_text_with_format(patient_input)
 
-            Provide a summary of the key medical entities found.""",
-            agent=self.agents["medical_nlp"],
-            expected_output="Summary of extracted medical entities"
-        )
+        # The NER output is already structured and summarized deterministically,
+        # so there is no "Task 1" asking the LLM to re-summarize it - the entity
+        # context is injected directly into the downstream task descriptions,
+        # saving one full Gemini round trip per query.
 
-        # Task 2: Clinical reasoning based on extracted entities
+        # Task 1: Clinical reasoning based on extracted entities
         reasoning_task = Task(
-            description=f"""Based on the extracted medical entities:
-
-            {entity_context}
-
-            Original text: {patient_input}
-
-            Provide:
-            1. Top 3 possible diagnoses based on the identified symptoms and conditions
-            2. Clinical significance of the identified medications
-            3. Any red flags requiring immediate attention""",
+            description=self._task_templates["reasoning"].format(
+                entity_context=entity_context,
+                patient_input=patient_input
+            ),
             agent=self.agents["clinical_reasoning"],
-            expected_output="Clinical assessment with differential diagnosis",
-            context=[nlp_task]
+            expected_output="Clinical assessment with differential diagnosis"
         )
 
-        # Task 3: Drug interaction check for identified medications
-        drug_task = Task(
-            description=f"""Review the medications identified:
-
-            Medications found: {ner_result['entities']['medications']}
-
-            Check for:
-            1. Potential drug-drug interactions
-            2. Contraindications based on identified conditions
-            3. Appropriate dosing concerns""",
-            agent=self.agents["drug_interaction"],
-            expected_output="Drug safety assessment"
-        )
-
-        # Task 4: Validate extracted entities and clinical reasoning
+        # Task 2: Drug interaction check - only worth an LLM call when the NER
+        # stage actually found medications
+        has_medications = bool(ner_result['entities']['medications'])
+        drug_task = None
+        if has_medications:
+            drug_task = Task(
+                description=self._task_templates["drug"].format(
+                    medications=ner_result['entities']['medications']
+                ),
+                agent=self.agents["drug_interaction"],
+                expected_output="Drug safety assessment"
+            )
+
+        # Task 3: Validate extracted entities and clinical reasoning
         validation_task = Task(
-            description=f"""Validate the medical information:
-
-            Extracted Entities:
-            - Diseases: {ner_result['statistics']['diseases']} found
-            - Symptoms: {ner_result['statistics']['symptoms']} found
-            - Medications: {ner_result['statistics']['medications']} found
-
-            Entities needing review: {ner_result['statistics']['needs_review']}
-
-            Verify the accuracy and flag any concerns.""",
+            description=self._task_templates["validation"].format(
+                diseases=ner_result['statistics']['diseases'],
+                symptoms=ner_result['statistics']['symptoms'],
+                medications=ner_result['statistics']['medications'],
+                needs_review=ner_result['statistics']['needs_review']
+            ),
             agent=self.agents["knowledge_validation"],
             expected_output="Validation report with confidence levels",
-            context=[nlp_task, reasoning_task, drug_task]
+            context=[reasoning_task, drug_task] if has_medications else [reasoning_task]
         )
 
-        # Task 5: Patient education
+        # Task 4: Patient education
         education_task = Task(
-            description="""Create a patient-friendly summary that:
-            1. Explains the identified conditions in simple terms
-            2. Clarifies medication purposes
-            3. Provides clear next steps
-
-            Use simple language, no medical jargon.""",
+            description=self._task_templates["education"],
             agent=self.agents["patient_education"],
             expected_output="Patient education summary",
             context=[reasoning_task, validation_task]
         )
 
-        # Create and run the crew
-        crew = Crew(
-            agents=list(self.agents.values()),
-            tasks=[nlp_task, reasoning_task, drug_task, validation_task, education_task],
+        # drug_task only depends on the NER result, not on reasoning_task, so
+        # the reasoning branch and the drug branch can run concurrently;
+        # validation and education then consume both branches sequentially.
+        reasoning_crew = Crew(
+            agents=[self.agents["clinical_reasoning"]],
+            tasks=[reasoning_task],
+            process=Process.sequential,
+            verbose=True,
+            max_rpm = 30,
+            task_callback=task_callback
+        )
+
+        parallel_crews = [reasoning_crew]
+        if has_medications:
+            parallel_crews.append(Crew(
+                agents=[self.agents["drug_interaction"]],
+                tasks=[drug_task],
+                process=Process.sequential,
+                verbose=True,
+                max_rpm = 30,
+                task_callback=task_callback
+            ))
+
+        final_crew = Crew(
+            agents=[self.agents["knowledge_validation"], self.agents["patient_education"]],
+            tasks=[validation_task, education_task],
             process=Process.sequential,
             verbose=True,
-            max_rpm = 30
+            max_rpm = 30,
+            task_callback=task_callback
         )
 
         try:
-            crew_result = self.process_with_retry(crew)
+            self.run_crews_parallel(*parallel_crews)
+            crew_result = self.process_with_retry(final_crew)
 
             # Combine NER results with crew analysis
             output = {
@@ -312,13 +384,12 @@ class EnhancedMedicalCrewMVP:
                 "patient_input": patient_input,
                 "ner_extraction": ner_result,
                 "clinical_analysis": {
-                    "entities_summary": str(nlp_task.output.raw) if hasattr(nlp_task.output, 'raw') else str(
-                        nlp_task.output),
+                    "entities_summary": ner_result["summary"],
                     "clinical_reasoning": str(reasoning_task.output.raw) if hasattr(reasoning_task.output,
                                                                                     'raw') else str(
                         reasoning_task.output),
-                    "drug_safety": str(drug_task.output.raw) if hasattr(drug_task.output, 'raw') else str(
-                        drug_task.output),
+                    "drug_safety": (str(drug_task.output.raw) if hasattr(drug_task.output, 'raw') else str(
+                        drug_task.output)) if has_medications else "No medications detected",
                     "validation": str(validation_task.output.raw) if hasattr(validation_task.output, 'raw') else str(
                         validation_task.output),
                     "patient_summary": str(education_task.output.raw) if hasattr(education_task.output, 'raw') else str(
@@ -1,8 +1,16 @@
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+from chromadb.config import Settings
+from sentence_transformers import SentenceTransformer
+import torch
 from Bio import Entrez
+from lxml import etree
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 print("PUBMED CHROMA DB CREATION")
@@ -16,31 +24,87 @@ Entrez.api_key = os.environ.get("Entrez.api_key")
 print(f"\n✓ Entrez email: {Entrez.email}")
 print(f"✓ API key configured: {Entrez.api_key is not None}\n")
 
+# NCBI recommends at most ~200 IDs per efetch; larger batches get throttled
+EFETCH_BATCH_SIZE = 200
+
+
+def _parse_article_records(handle):
+    """Stream-parse an efetch XML response into lightweight article dicts.
+
+    iterparse visits one PubmedArticle at a time and the subtree is freed
+    right after the three used fields are read, so peak memory stays at one
+    article instead of the whole nested Entrez.read structure.
+    """
+    def _full_text(parent, path):
+        # findtext stops at the first child node, truncating titles and
+        # abstracts with inline markup (<i>, <sub>, ...); itertext flattens
+        # the whole subtree like Entrez.read did
+        target = parent.find(path)
+        return "".join(target.itertext()) if target is not None else ""
+
+    records = []
+    for _, elem in etree.iterparse(handle, tag="PubmedArticle"):
+        records.append({
+            "pmid": elem.findtext(".//PMID", default=""),
+            "title": _full_text(elem, ".//ArticleTitle"),
+            "abstract": _full_text(elem, ".//AbstractText"),
+        })
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    return records
+
+
+def _fetch_article_batch(id_chunk):
+    """Fetch one efetch batch and return its parsed article records"""
+    handle = Entrez.efetch(db="pubmed", id=id_chunk, rettype="abstract", retmode="xml")
+    try:
+        return _parse_article_records(handle)
+    finally:
+        handle.close()
+
+
 def fetch_pubmed_articles(query, max_results=100):
     """Fetch articles from PubMed"""
     print(f"Searching PubMed: '{query}' (max {max_results} results)")
-    
+
     try:
         handle = Entrez.esearch(db="pubmed", term=query, retmax=max_results)
         record = Entrez.read(handle)
         handle.close()
-        
+
         id_list = record["IdList"]
         print(f"Found {len(id_list)} article IDs")
-        
+
         if not id_list:
             print("No articles found!")
             return None
-        
-        # Fetch details
-        print(f"Fetching article details...")
-        handle = Entrez.efetch(db="pubmed", id=id_list, rettype="abstract", retmode="xml")
-        articles = Entrez.read(handle)
-        handle.close()
-        
-        print(f"Fetched {len(articles.get('PubmedArticle', []))} full articles\n")
+
+        # Fetch details in concurrent 200-ID batches instead of one giant
+        # request that NCBI may throttle or silently truncate
+        id_chunks = [
+            id_list[i:i + EFETCH_BATCH_SIZE]
+            for i in range(0, len(id_list), EFETCH_BATCH_SIZE)
+        ]
+        print(f"Fetching article details ({len(id_chunks)} batches)...")
+
+        # Entrez allows 3 req/s without an API key, 10 req/s with one
+        submit_delay = 0.34 if Entrez.api_key is None else 0.11
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for id_chunk in id_chunks:
+                futures.append(executor.submit(_fetch_article_batch, id_chunk))
+                time.sleep(submit_delay)
+            batches = [future.result() for future in futures]
+
+        articles = []
+        for batch in batches:
+            articles.extend(batch)
+
+        print(f"Fetched {len(articles)} full articles\n")
         return articles
-        
+
     except Exception as e:
         print(f"Error fetching articles: {e}")
         return None
@@ -49,41 +113,41 @@ def fetch_pubmed_articles(query, max_results=100):
 def create_pubmed_chromadb(query, collection_name="pubmed_articles"):
     # Fetch articles
     articles = fetch_pubmed_articles(query, max_results=1000)
-    
-    if not articles or 'PubmedArticle' not in articles:
+
+    if not articles:
         print("No articles to process")
         return None
-    
+
     # Prepare documents
     documents = []
     metadatas = []
-    
-    print(f"Processing {len(articles['PubmedArticle'])} articles...")
-    
-    for i, article in enumerate(articles['PubmedArticle'], 1):
-        try:
-            article_data = article['MedlineCitation']['Article']
-            title = article_data['ArticleTitle']
-            abstract = article_data.get('Abstract', {}).get('AbstractText', [''])[0]
-            pmid = article['MedlineCitation']['PMID']
-            
-            full_text = f"{title}\n\n{abstract}"
-            documents.append(full_text)
-            
-            metadatas.append({
-                "pmid": str(pmid),
-                "title": title,
-                "source": "pubmed"
-            })
-            
-            if i % 10 == 0:
-                print(f"  ✓ Processed {i}/{len(articles['PubmedArticle'])}")
-                
-        except Exception as e:
-            print(f"Skipped article {i}: {e}")
+
+    print(f"Processing {len(articles)} articles...")
+
+    # One interned copy of the constant shared by every metadata dict
+    source = sys.intern("pubmed")
+    skipped = 0
+
+    for i, article in enumerate(articles, 1):
+        # Skip abstract-less articles before building any strings for them
+        abstract = article["abstract"]
+        if not abstract:
+            skipped += 1
             continue
-    
-    print(f"Prepared {len(documents)} documents\n")
+
+        title = article["title"]
+        documents.append("\n\n".join((title, abstract)))
+
+        metadatas.append({
+            "pmid": str(article["pmid"]),
+            "title": title,
+            "source": source
+        })
+
+        if i % 10 == 0:
+            print(f"  ✓ Processed {i}/{len(articles)}")
+
+    print(f"Prepared {len(documents)} documents ({skipped} without abstracts skipped)\n")
     
     if not documents:
         print("No valid documents")
@@ -93,28 +157,80 @@ def create_pubmed_chromadb(query, collection_name="pubmed_articles"):
     print(f"Splitting documents into chunks...")
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
-        chunk_overlap=200
+        chunk_overlap=200,
+        # Explicit frozen separators skip the default-separator resolution
+        # and separator re-escaping per document
+        separators=["\n\n", "\n", " ", ""],
+        keep_separator=False
     )
-    splits = text_splitter.create_documents(documents, metadatas=metadatas)
+
+    # Chunk the documents concurrently and reassemble in order; metadata is
+    # shared per source document instead of deep-copied per chunk
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        chunks_per_doc = list(executor.map(text_splitter.split_text, documents))
+
+    # Per-article chunk numbering keeps each id stable no matter which other
+    # articles the fetch happened to return or in what order
+    splits = []
+    ids = []
+    for chunks, metadata in zip(chunks_per_doc, metadatas):
+        pmid = metadata["pmid"]
+        for j, chunk in enumerate(chunks):
+            splits.append(Document(page_content=chunk, metadata=metadata))
+            ids.append(f"{pmid}-{j}")
     print(f"✓ Created {len(splits)} chunks\n")
     
     # Initialize embeddings
     print(f"Loading embedding model (this may take a minute on first run)...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(
+        "sentence-transformers/all-MiniLM-L6-v2", device=device
     )
-    print(f"✓ Model loaded\n")
-    
-    # Create Chroma DB
+    if device == "cuda":
+        model.half()  # FP16 halves memory traffic, ~2x encode throughput
+    print(f"✓ Model loaded ({device})\n")
+
+    # Embed every chunk in large batches up front instead of letting Chroma
+    # feed the embedder one document at a time
+    print(f"Embedding {len(splits)} chunks...")
+    texts = [split.page_content for split in splits]
+    embeddings = model.encode(
+        texts,
+        batch_size=128,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+
+    # Create Chroma DB with precomputed vectors; the HuggingFaceEmbeddings
+    # wrapper stays attached so similarity_search can embed queries
     print(f"Creating Chroma database...")
-    vectordb = Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
+    vectordb = Chroma(
         collection_name=collection_name,
-        persist_directory="./chroma_pubmed_db"  # Simpler path
+        embedding_function=HuggingFaceEmbeddings(
+            model_name="sentence-transformers/all-MiniLM-L6-v2"
+        ),
+        persist_directory="./chroma_pubmed_db",  # Simpler path
+        # When client_settings is supplied the langchain wrapper no longer
+        # sets is_persistent itself, so it must be explicit here or the
+        # client silently becomes in-memory
+        client_settings=Settings(
+            anonymized_telemetry=False,
+            is_persistent=True,
+            persist_directory="./chroma_pubmed_db"
+        )
+    )
+    # Deterministic pmid-based ids skip a uuid4() call per chunk, and upsert
+    # (not add, which only skips existing ids with a warning) makes
+    # re-ingesting the same article overwrite instead of duplicate
+    vectordb._collection.upsert(
+        ids=ids,
+        embeddings=embeddings.tolist(),
+        metadatas=[split.metadata for split in splits],
+        documents=texts
     )
     print(f"Database created: {vectordb._collection.count()} vectors\n")
-    
+
     return vectordb
 
 
@@ -1,104 +1,117 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 import re
 
 
+# Compiled once - strip_ansi_codes runs on every multi-KB agent output
+_ANSI_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+# One keep-alive session for all three endpoint probes - avoids a fresh TCP
+# handshake per request against the same localhost server
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+
 def strip_ansi_codes(text):
     """Remove ANSI color codes from text"""
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    return _ANSI_RE.sub('', text)
 
 
-def analyze_raw_output():
-    """Analyze raw output from different endpoints"""
-
-    print("=" * 80)
-    print("ANALYZING RAW OUTPUT")
-    print("=" * 80)
+_TEST_INPUT = "A 60-year-old woman with a history of rheumatoid arthritis and chronic kidney disease presents with increasing fatigue, shortness of breath, and lightheadedness. She reports no chest pain or bleeding. Recent labs reveal hemoglobin at 7.0 g/dL. Her medications include methotrexate and lisinopril. Physical exam is notable for pallor and mild ankle swelling. She requires evaluation for anemia of chronic disease and possible medication effects."
 
-    test_input = "A 60-year-old woman with a history of rheumatoid arthritis and chronic kidney disease presents with increasing fatigue, shortness of breath, and lightheadedness. She reports no chest pain or bleeding. Recent labs reveal hemoglobin at 7.0 g/dL. Her medications include methotrexate and lisinopril. Physical exam is notable for pallor and mild ankle swelling. She requires evaluation for anemia of chronic disease and possible medication effects."
 
-    # Test 1: Get raw crew output
-    print("\n1. TESTING RAW ENDPOINT (/api/v1/analyze-raw):")
-    print("-" * 40)
+def _probe_raw():
+    """Probe the raw endpoint; returns its report as a formatted string"""
+    lines = ["\n1. TESTING RAW ENDPOINT (/api/v1/analyze-raw):", "-" * 40]
 
     try:
-        response = requests.post(
+        response = _SESSION.post(
             "http://localhost:8000/api/v1/analyze-raw",
-            json={"patient_input": test_input}
+            json={"patient_input": _TEST_INPUT},
+            timeout=(5, 120)
         )
 
         if response.status_code == 200:
             result = response.json()
             raw_output = result.get('raw_crew_output', '')
 
-            print(f"✓ Raw output length: {len(raw_output)} chars")
-            print(f"✓ Processing time: {result.get('processing_time_ms')} ms")
+            lines.append(f"✓ Raw output length: {len(raw_output)} chars")
+            lines.append(f"✓ Processing time: {result.get('processing_time_ms')} ms")
 
             # Save raw output
             with open("raw_crew_output.txt", "w", encoding="utf-8") as f:
                 f.write(raw_output)
-            print("✓ Saved raw output to: raw_crew_output.txt")
+            lines.append("✓ Saved raw output to: raw_crew_output.txt")
 
             # Save cleaned output
             cleaned = strip_ansi_codes(raw_output)
             with open("cleaned_crew_output.txt", "w", encoding="utf-8") as f:
                 f.write(cleaned)
-            print(f"✓ Saved cleaned output to: cleaned_crew_output.txt")
-            print(f"✓ Size reduction after cleaning: {len(raw_output) - len(cleaned)} chars")
+            lines.append("✓ Saved cleaned output to: cleaned_crew_output.txt")
+            lines.append(f"✓ Size reduction after cleaning: {len(raw_output) - len(cleaned)} chars")
 
             # Show first 500 chars of each
-            print("\nRAW OUTPUT (first 500 chars):")
-            print(raw_output[:500])
+            lines.append("\nRAW OUTPUT (first 500 chars):")
+            lines.append(raw_output[:500])
 
-            print("\nCLEANED OUTPUT (first 500 chars):")
-            print(cleaned[:500])
+            lines.append("\nCLEANED OUTPUT (first 500 chars):")
+            lines.append(cleaned[:500])
 
     except Exception as e:
-        print(f"Error testing raw endpoint: {e}")
+        lines.append(f"Error testing raw endpoint: {e}")
 
-    # Test 2: Debug execution endpoint
-    print("\n2. TESTING DEBUG ENDPOINT (/api/v1/debug-execution):")
-    print("-" * 40)
+    return "\n".join(lines)
+
+
+def _probe_debug():
+    """Probe the debug endpoint; returns its report as a formatted string"""
+    lines = ["\n2. TESTING DEBUG ENDPOINT (/api/v1/debug-execution):", "-" * 40]
 
     try:
-        response = requests.post(
+        response = _SESSION.post(
             "http://localhost:8000/api/v1/debug-execution",
-            json={"patient_input": test_input}
+            json={"patient_input": _TEST_INPUT},
+            timeout=(5, 120)
         )
 
         if response.status_code == 200:
             result = response.json()
 
-            print(f"✓ Stdout captured: {result.get('stdout_length', 0)} chars")
-            print(f"✓ Result type: {result.get('final_result_type')}")
+            lines.append(f"✓ Stdout captured: {result.get('stdout_length', 0)} chars")
+            lines.append(f"✓ Result type: {result.get('final_result_type')}")
 
             stdout = result.get('captured_stdout', '')
             if stdout:
                 with open("debug_stdout.txt", "w", encoding="utf-8") as f:
                     f.write(stdout)
-                print("✓ Saved stdout to: debug_stdout.txt")
+                lines.append("✓ Saved stdout to: debug_stdout.txt")
 
                 # Check what's in stdout
-                print("\nContent analysis:")
+                lines.append("\nContent analysis:")
                 if "Medical NLP Specialist" in stdout:
-                    print("  ✓ Contains Medical NLP Specialist output")
+                    lines.append("  ✓ Contains Medical NLP Specialist output")
                 if "\x1b[" in stdout or "\033[" in stdout:
-                    print("  ⚠️ Contains ANSI escape codes")
+                    lines.append("  ⚠️ Contains ANSI escape codes")
                 if "Final Answer:" in stdout:
-                    print("  ✓ Contains Final Answer sections")
+                    lines.append("  ✓ Contains Final Answer sections")
 
     except Exception as e:
-        print(f"Error testing debug endpoint: {e}")
+        lines.append(f"Error testing debug endpoint: {e}")
+
+    return "\n".join(lines)
 
-    # Test 3: Analyze main endpoint agent outputs
-    print("\n3. ANALYZING MAIN ENDPOINT AGENT OUTPUTS:")
-    print("-" * 40)
+
+def _probe_main():
+    """Probe the main endpoint; returns its report as a formatted string"""
+    lines = ["\n3. ANALYZING MAIN ENDPOINT AGENT OUTPUTS:", "-" * 40]
 
     try:
-        response = requests.post(
+        response = _SESSION.post(
             "http://localhost:8000/api/v1/analyze",
-            json={"patient_input": test_input}
+            json={"patient_input": _TEST_INPUT},
+            timeout=(5, 120)
         )
 
         if response.status_code == 200:
@@ -107,24 +120,46 @@ def analyze_raw_output():
 
             for agent, output in agent_outputs.items():
                 if output:
-                    has_ansi = bool(re.search(r'\x1B|\033', output))
-                    cleaned = strip_ansi_codes(output)
+                    # subn cleans and counts in one pass over the string
+                    cleaned, ansi_count = _ANSI_RE.subn('', output)
+                    has_ansi = ansi_count > 0
                     reduction = len(output) - len(cleaned)
 
-                    print(f"\n{agent}:")
-                    print(f"  Original: {len(output)} chars")
-                    print(f"  Cleaned: {len(cleaned)} chars")
-                    print(f"  ANSI overhead: {reduction} chars ({reduction * 100 / len(output):.1f}%)")
-                    print(f"  Has ANSI codes: {has_ansi}")
+                    lines.append(f"\n{agent}:")
+                    lines.append(f"  Original: {len(output)} chars")
+                    lines.append(f"  Cleaned: {len(cleaned)} chars")
+                    lines.append(f"  ANSI overhead: {reduction} chars ({reduction * 100 / len(output):.1f}%)")
+                    lines.append(f"  Has ANSI codes: {has_ansi}")
 
                     # Save individual agent outputs
                     filename = f"agent_{agent}.txt"
                     with open(filename, "w", encoding="utf-8") as f:
                         f.write(cleaned)
-                    print(f"  Saved to: {filename}")
+                    lines.append(f"  Saved to: {filename}")
 
     except Exception as e:
-        print(f"Error analyzing main endpoint: {e}")
+        lines.append(f"Error analyzing main endpoint: {e}")
+
+    return "\n".join(lines)
+
+
+def analyze_raw_output():
+    """Analyze raw output from different endpoints"""
+
+    print("=" * 80)
+    print("ANALYZING RAW OUTPUT")
+    print("=" * 80)
+
+    # The three probes are independent server round trips - run them
+    # concurrently so total wall time is the slowest probe, not the sum.
+    # Each probe returns its whole report so output doesn't interleave.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(probe)
+            for probe in (_probe_raw, _probe_debug, _probe_main)
+        ]
+        for future in as_completed(futures):
+            print(future.result())
 
     print("\n" + "=" * 80)
     print("ANALYSIS COMPLETE")
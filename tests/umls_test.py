@@ -1,5 +1,6 @@
 
 """Quick debug function to see semantic types"""
+import asyncio
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -10,9 +11,13 @@ client = UMLSClient(os.environ.get("UMLS_API_KEY"), use_cache=False)
 # Test terms
 terms = ["diabetes", "aspirin", "heart", "fever"]
 
+# One batched call - the lookups run as a single concurrent wave instead
+# of one blocking UTS round-trip per term
+results = asyncio.run(client.lookup_terms_async(terms))
+
 for term in terms:
+    result = results[term.lower().strip()]
     print(f"\n=== Testing: {term} ===")
-    result = client.lookup_term(term)
 
     print(f"Entity Type: {result['entity_type']}")
     print(f"UMLS Code: {result.get('umls_code')}")
@@ -21,4 +26,4 @@ for term in terms:
     if result.get('metadata', {}).get('semantic_types'):
         print(f"Semantic Types: {result['metadata']['semantic_types']}")
 
-    print("-" * 30)
\ No newline at end of file
+    print("-" * 30)